@@ -0,0 +1,57 @@
+"""Measures cold-start import cost of each cs1 module.
+
+Each module is imported in a fresh interpreter so that nothing is cached
+between runs. Run from the repository root:
+
+    python benchmarks/import_time.py [--runs N]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+MODULES = ['cs1.notebooks', 'cs1.graphics', 'cs1.ppm']
+
+# Runs in the child interpreter; prints import time in milliseconds.
+_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print((time.perf_counter() - start) * 1000)
+"""
+
+class ImportFailed(Exception):
+    pass
+
+def time_import(module):
+    """Returns milliseconds to import module in a fresh interpreter.
+
+    Raises ImportFailed with the child's last line of stderr if the import fails.
+    """
+    result = subprocess.run(
+        [sys.executable, '-c', _SNIPPET.format(module=module)],
+        capture_output=True, text=True)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise ImportFailed(lines[-1] if lines else 'exit status {}'.format(result.returncode))
+    return float(result.stdout.strip())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5,
+                        help='fresh interpreters per module (default 5)')
+    args = parser.parse_args()
+
+    print('{:<16} {:>10} {:>10}'.format('module', 'median ms', 'min ms'))
+    for module in MODULES:
+        try:
+            times = [time_import(module) for _ in range(args.runs)]
+        except ImportFailed as e:
+            print('{:<16} {:>10}  {}'.format(module, 'failed', e))
+            continue
+        print('{:<16} {:>10.1f} {:>10.1f}'.format(
+            module, statistics.median(times), min(times)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Deferred imports for heavy dependencies.
+
+Importing ipycanvas, ipywidgets, okpy and friends is slow, and most notebooks
+only use a handful of functions from this package. A lazy module stands in
+for the real module and only imports it the first time an attribute is used.
+"""
+
+import importlib
+import sys
+import threading
+
+class _LazyModule(object):
+    """Placeholder for a module that is imported on first attribute access."""
+
+    def __init__(self, name):
+        """Create a LazyModule
+
+        Args:
+            name: fully qualified module name, e.g. 'IPython.display'.
+        """
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        # Only called for attributes not set in __init__. Private names are
+        # never forwarded, so e.g. copy.copy cannot recurse through _load.
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return "<lazy module '{}' ({})>".format(self._name, state)
+
+def lazy_import(name):
+    """Returns a proxy for module `name` that imports it on first use.
+
+    If the module has already been imported, it is returned directly.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return _LazyModule(name)
+
+def lazy_callable(module, name):
+    """Returns a function that calls `module.name`, importing module on first call.
+
+    Lets a module export a name such as a class or function from a lazy
+    module without importing it, e.g. through `from cs1.graphics import *`.
+    If the module is already imported, the real `module.name` is returned.
+    """
+    if not isinstance(module, _LazyModule):
+        return getattr(module, name)
+    def call(*args, **kwargs):
+        return getattr(module, name)(*args, **kwargs)
+    call.__name__ = call.__qualname__ = name
+    call.__doc__ = "Calls {}.{}, imported on first use.".format(module._name, name)
+    return call
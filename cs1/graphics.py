@@ -2,21 +2,51 @@
 Simple graphics library for COMP141: Computer Science I
 """
 
+from array import array
+from itertools import islice
 from tempfile import gettempdir
 from time import time, sleep
 from threading import Lock
 from uuid import uuid1
 
 import functools
+import math
 import os
-
-from jupyter_ui_poll import ui_events
-from ipyevents import Event
-
-import ipywidgets as widgets
-import IPython.display as disp
-
-from ipycanvas import MultiCanvas
+import struct
+import sys
+import warnings
+
+from cs1._lazy import lazy_import, lazy_callable
+
+# Widget libraries are slow to import; defer them until the canvas is used.
+_ui_poll = lazy_import('jupyter_ui_poll')
+_ipyevents = lazy_import('ipyevents')
+_ipycanvas = lazy_import('ipycanvas')
+widgets = lazy_import('ipywidgets')
+disp = lazy_import('IPython.display')
+
+# These used to be imported directly, and notebooks get them through
+# `from cs1.graphics import *`.
+ui_events = lazy_callable(_ui_poll, 'ui_events')
+Event = lazy_callable(_ipyevents, 'Event')
+MultiCanvas = lazy_callable(_ipycanvas, 'MultiCanvas')
+
+# Names exported by `from cs1.graphics import *`: the public API, plus the
+# names this file has always (if accidentally) exported.
+__all__ = [
+  'open_canvas', 'wait_for_mouse_click', 'get_mouse_click_x',
+  'get_mouse_click_y', 'get_canvas', 'clear_canvas', 'set_line_thickness',
+  'set_color', 'set_color_rgb', 'draw_circle', 'draw_filled_circle',
+  'draw_oval', 'draw_filled_oval', 'draw_line', 'draw_rect',
+  'draw_filled_rect', 'draw_polyline', 'draw_polygon', 'draw_filled_polygon',
+  'set_background_color', 'set_background_color_rgb', 'draw_string',
+  'save_canvas_as_image', 'checkpoint_canvas',
+  'Recording', 'start_recording', 'stop_recording', 'save_recording',
+  'load_recording', 'replay', 'diff_recordings',
+  'Limiter', 'rate_limit',
+  'gettempdir', 'time', 'sleep', 'Lock', 'uuid1', 'functools', 'os',
+  'ui_events', 'Event', 'MultiCanvas', 'widgets', 'disp',
+]
 
 # If true, print/log/display debug information.
 # False should be the distributed default.
@@ -77,8 +107,258 @@ _HARD_LIMIT = True
 _MAX_LIMITED = 20 # Fail if rate limited > 20 times and _HARD_LIMIT is set. 
 _limited_count = 0 # Counter for rate limiting.
 
+# Recording of drawing calls
+
+# Recordable operations, indexed by opcode, with the kind of each argument:
+# 'f' float, 'i' int, 's' string, '*' any number of points, given either as
+# flat x, y numbers or as (x, y) pairs. Only string colors can be recorded,
+# not gradients or patterns.
+# Only append to this table: opcodes are stored in saved recordings.
+_OPS = (
+  ('open_canvas', 'ff'),
+  ('clear_canvas', ''),
+  ('set_line_thickness', 'f'),
+  ('set_color', 's'),
+  ('set_color_rgb', 'iii'),
+  ('set_background_color', 's'),
+  ('set_background_color_rgb', 'iii'),
+  ('draw_circle', 'fff'),
+  ('draw_filled_circle', 'fff'),
+  ('draw_oval', 'ffff'),
+  ('draw_filled_oval', 'ffff'),
+  ('draw_line', 'ffff'),
+  ('draw_rect', 'ffff'),
+  ('draw_filled_rect', 'ffff'),
+  ('draw_polyline', '*'),
+  ('draw_polygon', '*'),
+  ('draw_filled_polygon', '*'),
+  ('draw_string', 'sfff'),
+)
+_OPCODES = {name: (code, kinds) for code, (name, kinds) in enumerate(_OPS)}
+
+# Saved recording layout (little-endian): magic, version, op count, number
+# count, string count; then opcodes (1 byte each), numbers (8 byte floats)
+# and strings (4 byte length followed by utf-8 bytes).
+# A '*' op stores how many numbers follow before its points; the count is
+# negative when the points were given as (x, y) pairs.
+_RECORDING_MAGIC = b'CS1R'
+_RECORDING_VERSION = 1
+_RECORDING_HEADER = struct.Struct('<4sBIII')
+_STR_LEN = struct.Struct('<I')
+
+def _flatten(values, out):
+  """Appends the numbers in values, which may be nested sequences, to out."""
+  for v in values:
+    if isinstance(v, (str, bytes)):
+      raise TypeError("Expected a number or point, got {!r}".format(v))
+    try:
+      out.append(float(v))
+    except TypeError:
+      _flatten(v, out)
+  return out
+
+def _is_pair(v):
+  return isinstance(v, (tuple, list)) and len(v) == 2
+
+def _common_prefix(a, b):
+  """Returns the length of the common prefix of two sequences.
+
+  Binary search on slice equality keeps the comparisons in C.
+  """
+  lo, hi = 0, min(len(a), len(b))
+  while lo < hi:
+    mid = (lo + hi + 1) // 2
+    if a[:mid] == b[:mid]:
+      lo = mid
+    else:
+      hi = mid - 1
+  return lo
+
+class Recording:
+  """Compact log of drawing calls.
+
+  Opcodes, numeric arguments and string arguments are kept in separate
+  arrays, so each call costs a byte plus 8 bytes per coordinate.
+  Iterating yields (function name, args) pairs in call order.
+  """
+  def __init__(self):
+    self._ops = array('B')
+    self._nums = array('d')
+    self._strs = []
+
+  def __len__(self):
+    return len(self._ops)
+
+  def __eq__(self, other):
+    if not isinstance(other, Recording):
+      return NotImplemented
+    # Compare bytes, so a recording containing NaN equals itself.
+    return (self._ops == other._ops
+            and self._nums.tobytes() == other._nums.tobytes()
+            and self._strs == other._strs)
+
+  def __iter__(self):
+    return self._calls(0, 0, 0, len(self._ops))
+
+  def _calls(self, op, num, string, stop):
+    """Yields decoded calls from op up to stop, given where op's arguments start."""
+    nums = islice(self._nums, num, None)
+    strs = islice(self._strs, string, None)
+    for code in self._ops[op:stop]:
+      name, kinds = _OPS[code]
+      if kinds == '*':
+        count = int(next(nums))
+        points = islice(nums, abs(count))
+        args = tuple(zip(points, points)) if count < 0 else tuple(points)
+      else:
+        args = []
+        for kind in kinds:
+          if kind == 's':
+            args.append(next(strs))
+          elif kind == 'i':
+            args.append(int(next(nums)))
+          else:
+            args.append(next(nums))
+        args = tuple(args)
+      yield name, args
+
+  def _offsets(self):
+    """Returns where each call's numbers and strings start.
+
+    Both lists have one more entry than there are calls, holding the totals.
+    Raises ValueError if the point counts are corrupt.
+    """
+    num_starts = [0]
+    str_starts = [0]
+    n_nums = 0
+    n_strs = 0
+    for code in self._ops:
+      kinds = _OPS[code][1]
+      if kinds == '*':
+        if n_nums >= len(self._nums):
+          raise ValueError("Corrupt graphics recording (missing point count).")
+        count = self._nums[n_nums]
+        if not math.isfinite(count) or count != int(count) or (count < 0 and count % 2):
+          raise ValueError("Corrupt graphics recording (bad point count).")
+        n_nums += 1 + abs(int(count))
+      else:
+        n_strs += kinds.count('s')
+        n_nums += len(kinds) - kinds.count('s')
+      num_starts.append(n_nums)
+      str_starts.append(n_strs)
+    return num_starts, str_starts
+
+  def append(self, name, args):
+    """Appends a call to the drawing function `name` with positional args."""
+    code, kinds = _OPCODES[name]
+    if kinds == '*':
+      nums = _flatten(args, [])
+      pairs = bool(args) and all(_is_pair(a) for a in args)
+      nums.insert(0, -len(nums) if pairs else len(nums))
+      strs = []
+    else:
+      nums = [a for k, a in zip(kinds, args) if k != 's']
+      strs = [a for k, a in zip(kinds, args) if k == 's']
+      for a in strs:
+        if not isinstance(a, str):
+          raise TypeError("Only string colors and messages can be recorded, got {!r}".format(a))
+    # Convert numbers before touching any array, so a bad argument cannot
+    # leave the recording half written.
+    self._nums.extend(array('d', nums))
+    self._strs.extend(strs)
+    self._ops.append(code)
+
+  def to_bytes(self):
+    """Returns the binary encoding of this recording."""
+    nums = array('d', self._nums)
+    if sys.byteorder == 'big':
+      nums.byteswap()
+    strs = [s.encode('utf-8') for s in self._strs]
+    parts = [
+        _RECORDING_HEADER.pack(_RECORDING_MAGIC, _RECORDING_VERSION,
+                               len(self._ops), len(nums), len(strs)),
+        self._ops.tobytes(), nums.tobytes()]
+    for s in strs:
+      parts.append(_STR_LEN.pack(len(s)))
+      parts.append(s)
+    return b''.join(parts)
+
+  @classmethod
+  def from_bytes(cls, data):
+    """Decodes a recording produced by to_bytes."""
+    try:
+      magic, version, n_ops, n_nums, n_strs = _RECORDING_HEADER.unpack_from(data)
+    except struct.error:
+      raise ValueError("Not a graphics recording (too short).")
+    if magic != _RECORDING_MAGIC:
+      raise ValueError("Not a graphics recording.")
+    if version != _RECORDING_VERSION:
+      raise ValueError("Unsupported recording version {}.".format(version))
+    rec = cls()
+    pos = _RECORDING_HEADER.size
+    try:
+      rec._ops.frombytes(data[pos:pos + n_ops])
+      pos += n_ops
+      n_bytes = n_nums * rec._nums.itemsize
+      rec._nums.frombytes(data[pos:pos + n_bytes])
+      pos += n_bytes
+      if sys.byteorder == 'big':
+        rec._nums.byteswap()
+      for _ in range(n_strs):
+        (size,) = _STR_LEN.unpack_from(data, pos)
+        pos += _STR_LEN.size
+        rec._strs.append(data[pos:pos + size].decode('utf-8'))
+        pos += size
+    except (struct.error, UnicodeDecodeError):
+      raise ValueError("Corrupt graphics recording (truncated strings).")
+    if len(rec._ops) != n_ops or len(rec._nums) != n_nums or pos != len(data):
+      raise ValueError("Corrupt graphics recording.")
+    if any(code >= len(_OPS) for code in rec._ops):
+      raise ValueError("Recording contains unknown drawing operations.")
+    num_starts, str_starts = rec._offsets()
+    if num_starts[-1] != n_nums or str_starts[-1] != n_strs:
+      raise ValueError("Corrupt graphics recording (argument counts do not match).")
+    return rec
+
+# The active recording, or None when not recording.
+_recording = None
+# Depth of recordable calls in progress. Only the outermost call is recorded,
+# so e.g. the border drawn by open_canvas is not recorded twice.
+_record_depth = 0
+# Undecorated drawing functions by name, called directly by replay.
+_RAW_OPS = {}
+
+def _recorded(f):
+  """Decorator to record calls to f in the active recording.
+
+  Only this module's drawing operations are recorded; any other function
+  (e.g. a student's own @rate_limit function) is returned as is.
+  """
+  if f.__module__ != __name__ or f.__name__ not in _OPCODES:
+    return f
+  _RAW_OPS[f.__name__] = getattr(f, '__wrapped__', f)
+  @functools.wraps(f)
+  def record(*args, **kwargs):
+    global _record_depth
+    _record_depth += 1
+    try:
+      result = f(*args, **kwargs)
+    finally:
+      _record_depth -= 1
+    if _recording is not None and _record_depth == 0:
+      # The call itself succeeded, so never let recording break it.
+      try:
+        if kwargs:
+          import inspect
+          args = inspect.signature(f).bind(*args, **kwargs).args
+        _recording.append(f.__name__, args)
+      except Exception as e:
+        warnings.warn("{} was not recorded: {}".format(f.__name__, e), RuntimeWarning)
+    return result
+  return record
+
 def rate_limit(f):
-  """Decorator to rate limit f."""
+  """Decorator to rate limit f. Drawing calls are also recorded."""
   @functools.wraps(f)
   def maybe_delay(*args, **kwargs):
     global _limiter, _limited_count
@@ -91,7 +371,7 @@ def rate_limit(f):
         raise RuntimeError("Too many graphics calls too frequently! Do you have an infinite loop?")
       sleep(_BACKOFF_SLEEP_SECS)
     return f(*args, **kwargs)
-  return maybe_delay
+  return _recorded(maybe_delay)
 
 # Canvas; foreground and background layers.
 _canvas = None
@@ -126,7 +406,7 @@ def _handle_event(event):
 def open_canvas(width, height):
   """Creates a window for painting of a given width and height."""
   global _canvas, _bg, _fg, _events, _out
-  _canvas = MultiCanvas(
+  _canvas = _ipycanvas.MultiCanvas(
       n_canvases=2, width=width, height=height,
       sync_image_data=True)
   for c in _canvas:
@@ -138,9 +418,9 @@ def open_canvas(width, height):
   disp.display(_out)
 
   # Register event listeners, and ignore drag events on the canvas.
-  _ = Event(source=_out, watched_events=['dragstart'],
+  _ = _ipyevents.Event(source=_out, watched_events=['dragstart'],
           prevent_default_action=True)
-  _events = Event(source=_out, watched_events=['click'])
+  _events = _ipyevents.Event(source=_out, watched_events=['click'])
   _events.on_dom_event(_handle_event)
 
   if _DRAW_BORDER:
@@ -151,7 +431,7 @@ def wait_for_mouse_click():
   """Waits until the mouse has been clicked."""
   global _last_mouse_ts
   now = time()
-  with ui_events() as ui_poll:
+  with _ui_poll.ui_events() as ui_poll:
     while True:
       ui_poll(20)
       if _last_mouse_ts and _last_mouse_ts > now:
@@ -178,12 +458,14 @@ def clear_canvas():
   _check()
   _fg.clear()
 
+@_recorded
 def set_line_thickness(thickness):
   """Sets the canvas painting line width to the value given."""
   global _fg
   _check()
   _fg.line_width = thickness
 
+@_recorded
 def set_color(color):
   """Sets the current painting color."""
   global _fg
@@ -197,6 +479,7 @@ def _clamp(v):
 def _rgb2str(r, g, b):
   return '#%02x%02x%02x' % (_clamp(r), _clamp(g), _clamp(b))
 
+@_recorded
 def set_color_rgb(r, g, b):
   """Sets the current painting color."""
   global _fg
@@ -294,6 +577,7 @@ def draw_filled_polygon(*points):
   global _fg
   _fg.fill_polygon(list(points))
   
+@_recorded
 def set_background_color(color):
   """Sets the background color of the canvas.  Can be called at any time and the color will
   instantly change."""
@@ -302,6 +586,7 @@ def set_background_color(color):
   _bg.fill_style = color
   _bg.fill_rect(0, 0, _canvas.width, _canvas.height)
 
+@_recorded
 def set_background_color_rgb(r, g, b):
   """Sets the background color of the canvas.  Can be called at any time and the color will
   instantly change."""
@@ -339,3 +624,119 @@ def checkpoint_canvas():
     os.remove(tname)
   except:
     pass # swallow any error.
+
+# Recording and replay
+
+_REPLAY_BATCH = 50 # Drawing calls replayed per batch.
+_REPLAY_PAUSE_SECS = 0.5 # Pause between batches at speed 1, matching _limiter.
+
+def start_recording():
+  """Starts recording all drawing calls, discarding any earlier recording."""
+  global _recording
+  _recording = Recording()
+
+def stop_recording():
+  """Stops recording and returns the recording."""
+  global _recording
+  rec = _recording
+  _recording = None
+  return rec
+
+def save_recording(filename, recording=None):
+  """Saves a recording (by default, the one in progress) to the supplied filename."""
+  if recording is None:
+    recording = _recording
+  if recording is None:
+    raise RuntimeError("Nothing is being recorded.")
+  with open(filename, 'wb') as f:
+    f.write(recording.to_bytes())
+
+def load_recording(filename):
+  """Loads a recording saved with save_recording."""
+  with open(filename, 'rb') as f:
+    return Recording.from_bytes(f.read())
+
+def replay(recording, speed=1):
+  """Replays the drawing calls in a recording.
+
+  Calls are issued in batches, pausing between batches. speed scales the
+  pace: 2 replays twice as fast as the default, float('inf') does not pause.
+  Replayed calls are not rate limited and are not recorded.
+  """
+  global _record_depth
+  if speed <= 0:
+    raise ValueError("speed must be positive.")
+  pause = _REPLAY_PAUSE_SECS / speed
+  calls = iter(recording)
+  _record_depth += 1
+  try:
+    while True:
+      batch = list(islice(calls, _REPLAY_BATCH))
+      for name, args in batch:
+        _RAW_OPS[name](*args)
+      if len(batch) < _REPLAY_BATCH:
+        return
+      if pause:
+        sleep(pause)
+  finally:
+    _record_depth -= 1
+
+# Stands in for NaN arguments when comparing calls, since NaN != NaN.
+_NAN_KEY = object()
+
+def _call_key(call):
+  name, args = call
+  return name, tuple(_NAN_KEY if a != a else a for a in args)
+
+def diff_recordings(a, b):
+  """Compares two recordings call by call, aligning calls that match.
+
+  Returns a list of (tag, i1, i2, j1, j2) tuples, one for each run of calls
+  that differ, in the format of difflib.SequenceMatcher.get_opcodes:
+  'replace' means a[i1:i2] was replaced by b[j1:j2], 'delete' means a[i1:i2]
+  is missing from b, and 'insert' means b[j1:j2] is missing from a. Indexes
+  count calls. An empty list means the recordings drew exactly the same thing.
+
+  Calls shared at the start and end are skipped by comparing the raw arrays;
+  only the calls in between are decoded and aligned.
+  """
+  import difflib
+  if a == b:
+    return []
+  a_nums, a_strs = a._offsets()
+  b_nums, b_strs = b._offsets()
+  a_bytes, b_bytes = a._nums.tobytes(), b._nums.tobytes()
+  size = a._nums.itemsize
+
+  # Calls a[:head] == b[:head] when their opcodes, numbers and strings match.
+  ops = _common_prefix(a._ops, b._ops)
+  nums = _common_prefix(a_bytes, b_bytes) // size
+  strs = _common_prefix(a._strs, b._strs)
+  head = ops
+  while head and (a_nums[head] > nums or a_strs[head] > strs):
+    head -= 1
+
+  # Likewise for the calls at the end, without overlapping the head. The
+  # calls must also start at the same distance from the end in both, since
+  # point counts are only read going forward.
+  n_a, n_b = len(a), len(b)
+  ops = min(_common_prefix(a._ops[::-1], b._ops[::-1]), n_a - head, n_b - head)
+  nums = _common_prefix(a._nums[::-1].tobytes(), b._nums[::-1].tobytes()) // size
+  strs = _common_prefix(a._strs[::-1], b._strs[::-1])
+  tail = ops
+  while tail:
+    a_tail_nums = a_nums[-1] - a_nums[n_a - tail]
+    a_tail_strs = a_strs[-1] - a_strs[n_a - tail]
+    if (a_tail_nums <= nums and a_tail_strs <= strs
+        and a_tail_nums == b_nums[-1] - b_nums[n_b - tail]
+        and a_tail_strs == b_strs[-1] - b_strs[n_b - tail]):
+      break
+    tail -= 1
+
+  a_mid = a._calls(head, a_nums[head], a_strs[head], n_a - tail)
+  b_mid = b._calls(head, b_nums[head], b_strs[head], n_b - tail)
+  matcher = difflib.SequenceMatcher(
+      None, [_call_key(c) for c in a_mid], [_call_key(c) for c in b_mid],
+      autojunk=False)
+  return [(tag, i1 + head, i2 + head, j1 + head, j2 + head)
+          for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
@@ -9,8 +9,26 @@ import os
 import sys
 import urllib
 
-from client.api.notebook import Notebook
-from IPython.display import display, Markdown, Latex
+from cs1._lazy import lazy_import, lazy_callable
+
+# okpy and IPython are slow to import; defer them until first use.
+_ok_notebook = lazy_import('client.api.notebook')
+_ipy_display = lazy_import('IPython.display')
+
+# These used to be imported directly, and notebooks get them through
+# `from cs1.notebooks import *`.
+Notebook = lazy_callable(_ok_notebook, 'Notebook')
+display = lazy_callable(_ipy_display, 'display')
+Markdown = lazy_callable(_ipy_display, 'Markdown')
+Latex = lazy_callable(_ipy_display, 'Latex')
+
+# Names exported by `from cs1.notebooks import *`: the public API, plus the
+# modules this file has always (if accidentally) exported.
+__all__ = [
+    'ok_login', 'ok_runtests', 'ok_submit', 'reload_functions', 'open',
+    'FileSizeException', 'Notebook', 'display', 'Markdown', 'Latex',
+    'ast', 'builtins', 'json', 'os', 'sys', 'urllib',
+]
 
 # The ok control variable.
 _ok = None
@@ -113,7 +131,7 @@ def _force_login(okfile, ignore_cache, ok_force, ok_inline):
     global _ok
     _ok = None
     _validate_or_create(okfile, ignore_cache)
-    _ok = Notebook(okfile)
+    _ok = _ok_notebook.Notebook(okfile)
     _ok.auth(inline=ok_inline, force=ok_force)
 
 def ok_login(okfile, ignore_cache=False, ok_force=False, ok_inline=True):
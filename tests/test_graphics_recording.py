@@ -0,0 +1,181 @@
+"""Tests for recording and replaying cs1.graphics drawing calls.
+
+The canvas is replaced with a stub, so the widget libraries are not needed.
+"""
+
+import math
+import time
+
+import pytest
+
+import cs1.graphics as g
+
+class _StubLayer:
+  """Canvas layer that logs method calls."""
+  def __init__(self, log):
+    object.__setattr__(self, 'log', log)
+
+  def __getattr__(self, attr):
+    return lambda *args: self.log.append((attr, args))
+
+  def __setattr__(self, attr, value):
+    self.log.append((attr, value))
+
+class _StubCanvas(list):
+  width = 100
+  height = 100
+
+@pytest.fixture
+def canvas(monkeypatch):
+  log = []
+  monkeypatch.setattr(g, '_canvas', _StubCanvas())
+  monkeypatch.setattr(g, '_fg', _StubLayer(log))
+  monkeypatch.setattr(g, '_bg', _StubLayer(log))
+  monkeypatch.setattr(g, '_limiter', g.Limiter(limit=10_000))
+  yield log
+  g.stop_recording()
+
+def _draw_scene():
+  g.set_color('red')
+  g.set_line_thickness(2.5)
+  g.draw_circle(10, 20, 5)
+  g.draw_polygon(1, 2, 3, 4, 5, 6)
+  g.draw_string('hi', x=1, y=2, textSize=12)
+  g.set_color_rgb(1, 2, 3)
+  g.set_background_color('blue')
+
+def _record(draw):
+  g.start_recording()
+  draw()
+  return g.stop_recording()
+
+def test_records_calls(canvas):
+  rec = _record(_draw_scene)
+  assert list(rec) == [
+      ('set_color', ('red',)),
+      ('set_line_thickness', (2.5,)),
+      ('draw_circle', (10, 20, 5)),
+      ('draw_polygon', (1, 2, 3, 4, 5, 6)),
+      ('draw_string', ('hi', 1, 2, 12)),
+      ('set_color_rgb', (1, 2, 3)),
+      ('set_background_color', ('blue',)),
+  ]
+
+def test_point_pairs_are_kept(canvas):
+  rec = _record(lambda: g.draw_polygon((10, 10), (20, 20), (30, 40)))
+  assert list(rec) == [('draw_polygon', ((10, 10), (20, 20), (30, 40)))]
+
+def test_replay_keeps_point_form(canvas):
+  def draw():
+    g.draw_polygon((10, 10), (20, 20), (30, 40))
+    g.draw_polyline(1, 2, 3, 4)
+  rec = _record(draw)
+  drawn = list(canvas)
+  del canvas[:]
+  g.replay(rec, speed=math.inf)
+  assert canvas == drawn
+  assert drawn[0] == ('stroke_polygon', ([(10, 10), (20, 20), (30, 40)],))
+
+def test_student_rate_limit_is_not_recorded(canvas):
+  @g.rate_limit
+  def draw_line(x1, y1, x2, y2):
+    pass
+  rec = _record(lambda: draw_line(0, 0, 1, 1))
+  assert len(rec) == 0
+  assert g._RAW_OPS['draw_line'] is not draw_line.__wrapped__
+
+def test_unrecordable_call_still_draws(canvas):
+  gradient = object()
+  g.start_recording()
+  with pytest.warns(RuntimeWarning):
+    g.set_color(gradient)
+  assert len(g.stop_recording()) == 0
+  assert ('fill_style', gradient) in canvas
+
+def test_save_load_round_trip(canvas, tmp_path):
+  rec = _record(_draw_scene)
+  fname = str(tmp_path / 'scene.rec')
+  g.save_recording(fname, rec)
+  loaded = g.load_recording(fname)
+  assert loaded == rec
+  assert list(loaded) == list(rec)
+
+def test_replay_draws_same_calls(canvas):
+  rec = _record(_draw_scene)
+  drawn = list(canvas)
+  del canvas[:]
+  g.start_recording()
+  g.replay(rec, speed=math.inf)
+  assert canvas == drawn
+  assert len(g.stop_recording()) == 0
+
+def test_replay_rejects_bad_speed(canvas):
+  with pytest.raises(ValueError):
+    g.replay(g.Recording(), speed=0)
+
+@pytest.mark.parametrize('cut', [3, 10, -1, -3])
+def test_truncated_file_is_rejected(canvas, cut):
+  data = _record(_draw_scene).to_bytes()
+  with pytest.raises(ValueError):
+    g.Recording.from_bytes(data[:cut])
+
+def test_mismatched_counts_are_rejected():
+  rec = g.Recording()
+  rec.append('draw_line', (0, 0, 1, 1))
+  rec._ops.append(g._OPCODES['draw_circle'][0])
+  with pytest.raises(ValueError):
+    g.Recording.from_bytes(rec.to_bytes())
+
+@pytest.mark.parametrize('count', [math.inf, math.nan, 2.5, -3])
+def test_bad_point_count_is_rejected(count):
+  rec = g.Recording()
+  rec.append('draw_polyline', (1, 2, 3))
+  rec._nums[0] = count
+  with pytest.raises(ValueError, match='bad point count'):
+    g.Recording.from_bytes(rec.to_bytes())
+
+def test_bad_magic_is_rejected():
+  with pytest.raises(ValueError):
+    g.Recording.from_bytes(b'JUNK' + bytes(13))
+
+def test_diff_identical(canvas):
+  assert g.diff_recordings(_record(_draw_scene), _record(_draw_scene)) == []
+
+def test_nan_recording_equals_itself():
+  rec = g.Recording()
+  rec.append('draw_circle', (math.nan, 0, 1))
+  assert rec == rec
+  assert g.diff_recordings(rec, rec) == []
+
+def test_diff_aligns_insertions(canvas):
+  a = _record(_draw_scene)
+  def more():
+    g.set_color('green')
+    _draw_scene()
+    g.draw_line(0, 0, 5, 5)
+  b = _record(more)
+  assert g.diff_recordings(a, b) == [('insert', 0, 0, 0, 1), ('insert', 7, 7, 8, 9)]
+
+def test_diff_replacement(canvas):
+  a = _record(lambda: (g.draw_line(0, 0, 1, 1), g.draw_circle(1, 1, 1)))
+  b = _record(lambda: (g.draw_line(0, 0, 1, 2), g.draw_circle(1, 1, 1)))
+  assert g.diff_recordings(a, b) == [('replace', 0, 1, 0, 1)]
+
+def test_diff_large_recording_with_one_change():
+  a = g.Recording()
+  b = g.Recording()
+  for i in range(20_000):
+    a.append('draw_line', (i % 7, 0, 1, 1))
+    b.append('draw_line', (i % 7, 0, 1, 2 if i == 12_345 else 1))
+  a.append('draw_polygon', ((1, 2), (3, 4)))
+  b.append('draw_polygon', ((1, 2), (3, 4)))
+  start = time.perf_counter()
+  assert g.diff_recordings(a, b) == [('replace', 12_345, 12_346, 12_345, 12_346)]
+  assert time.perf_counter() - start < 1
+
+def test_diff_tail_needs_same_call_boundaries():
+  a = g.Recording()
+  a.append('draw_polyline', (2, 7))
+  b = g.Recording()
+  b.append('draw_polyline', (5, 2, 2, 7))
+  assert g.diff_recordings(a, b) == [('replace', 0, 1, 0, 1)]
@@ -0,0 +1,51 @@
+"""Tests for deferred imports of heavy dependencies."""
+
+import copy
+import json
+import subprocess
+import sys
+
+from cs1._lazy import _LazyModule, lazy_callable, lazy_import
+
+HEAVY = ['ipycanvas', 'ipywidgets', 'ipyevents', 'jupyter_ui_poll', 'client.api.notebook']
+
+# Names that `from cs1.<module> import *` exported before imports were deferred.
+STAR_NAMES = {
+    'cs1.graphics': ['MultiCanvas', 'Event', 'ui_events', 'widgets', 'disp',
+                     'open_canvas', 'draw_line', 'Limiter', 'rate_limit'],
+    'cs1.notebooks': ['Notebook', 'display', 'Markdown', 'Latex',
+                      'ok_login', 'reload_functions', 'open', 'FileSizeException'],
+}
+
+_SNIPPET = """
+import json, sys
+ns = {{}}
+exec('from {module} import *', ns)
+print(json.dumps({{'names': sorted(ns), 'modules': sorted(sys.modules)}}))
+"""
+
+def _star_import(module):
+  result = subprocess.run(
+      [sys.executable, '-c', _SNIPPET.format(module=module)],
+      capture_output=True, text=True, check=True)
+  return json.loads(result.stdout)
+
+def test_star_imports_keep_names_without_heavy_imports():
+  for module, names in STAR_NAMES.items():
+    result = _star_import(module)
+    assert set(names) <= set(result['names']), module
+    assert 'lazy_import' not in result['names'], module
+    assert not set(HEAVY) & set(result['modules']), module
+
+def test_lazy_module_imports_on_first_use():
+  mod = _LazyModule('json')
+  assert mod._module is None
+  assert mod.dumps([1]) == '[1]'
+  assert mod._module is json
+
+def test_lazy_module_can_be_copied():
+  copy.copy(_LazyModule('json'))
+
+def test_loaded_module_is_returned_directly():
+  assert lazy_import('json') is json
+  assert lazy_callable(json, 'JSONDecoder') is json.JSONDecoder